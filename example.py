@@ -2,32 +2,59 @@
 
 import random
 import subprocess
+import sys
+import time
+
+# Query the fan through NVML when pynvml is installed, it avoids spawning nvidia-smi on every poll
+try:
+    import pynvml
+    pynvml.nvmlInit()
+    nvml_handle = pynvml.nvmlDeviceGetHandleByIndex(0)
+except Exception:
+    nvml_handle = None
+
+# Last nvidia-smi reading as (time, value), reused for back-to-back polls
+last_fan = (0.0, None)
+
+
+def gpu_fan_speed():
+    global last_fan
+    if nvml_handle is not None:
+        try:
+            return pynvml.nvmlDeviceGetFanSpeed(nvml_handle)
+        except pynvml.NVMLError:
+            return ""
+    if last_fan[1] is None or time.monotonic() - last_fan[0] >= 0.5:
+        stdout = subprocess.run(["nvidia-smi", "--query-gpu=fan.speed", "--format=csv,noheader,nounits"], check=True, stdout=subprocess.PIPE).stdout.decode('utf-8')
+        last_fan = (time.monotonic(), stdout.split("\n")[0].strip())
+    return last_fan[1]
+
+
+# Sensor name -> command -> function returning the reply, missing commands get an empty reply
+sensors = {
+    "gpu_fan_speed": {
+        "value": gpu_fan_speed,
+        "min": lambda: 0,
+        "max": lambda: 100,
+        "unit": lambda: "%",
+    },
+    "frandom": {
+        "value": random.random,
+    },
+}
+sensor_list = "\t".join(sensors)
+
+
+def reply(value):
+    # One write and one flush per reply, stdout is block buffered when connected to the plugin
+    sys.stdout.write(f"{value}\n")
+    sys.stdout.flush()
+
 
 while True:
     req = input().strip().split("\t")
     if req[0] == "?":
-        print("gpu_fan_speed\tfrandom")
-    elif req[0] == "gpu_fan_speed":
-        if (req[1] == "value"):
-            stdout = subprocess.run(["nvidia-smi", "-q"], check=True, stdout=subprocess.PIPE).stdout.decode('utf-8')
-            for string in stdout.split("\n"):
-                if "Fan Speed" in string:
-                    print(string.split(":")[1].replace("%", "").replace(" ", ""))
-                    break
-            else:
-                print()
-        elif (req[1] == "min"):
-            print(0)
-        elif (req[1] == "max"):
-            print(100)
-        elif (req[1] == "unit"):
-            print("%")
-        else:
-            print()
-    elif req[0] == "frandom":
-        if (req[1] == "value"):
-            print(random.random())
-        else:
-            print()
+        reply(sensor_list)
     else:
-        print()
+        handler = sensors.get(req[0], {}).get(req[-1])
+        reply(handler() if handler else "")